@@ -3,7 +3,18 @@ from __future__ import annotations
 import os
 import threading
 import time
-from typing import Any, Dict, Iterable, List
+import warnings
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Tuple
+
+_FRAME_SKIPPED = object()
+_DEMAND_WINDOW = 1.0
+_IDLE_WAKE_TIMEOUT = 0.5
+_PLACEHOLDER_CACHE_SIZE = 4
+_MAX_STALE_GRABS = 3
+_QUEUED_GRAB_SECONDS = 0.002
+_QUEUE_PROBE_NS = 1_000_000
+_PLACEHOLDER_INTERVAL = 0.1
 
 
 class CameraStream:
@@ -27,21 +38,47 @@ class CameraStream:
         self._np = np_module
         self._picamera2_class = picamera2_class
 
-        self._lock = threading.Lock()
-        self._running = True
-        self._latest_frame = None
+        # Replaced as a whole, so readers need no lock; the condition only serves blocking waits.
+        self._published: Tuple[int, Any] = (0, None)
+        self._frame_cv = threading.Condition()
+        self._last_demand_at = 0.0
+        self._waiters = 0
+        self._idle_until = 0.0
+        # OpenCV decodes into these alternately, so a published frame survives one more retrieve.
+        self._retrieve_buffers: List[Any] = [None, None]
+        self._retrieve_slot = 0
         self._source = "none"
         self._error = "Initializing"
 
         self._opencv_cap = None
         self._active_opencv_device = str(camera_id)
         self._picamera = None
+        self._buffer_size_applied = True
+        self._wait_any_supported = False
+        self._last_grab_at = 0.0
+        self._backlog = 0.0
         self._reconnect_interval = max(reconnect_interval, 0.1)
         self._next_reconnect_at = 0.0
+        self._reconnect_thread: threading.Thread | None = None
+        self._closed = False
+
+        self.refresh_env()
+
+        self._placeholder_lock = threading.Lock()
+        self._placeholder_cache: OrderedDict[str, Any] = OrderedDict()
+        self._placeholder_base = self._build_placeholder_base()
 
+        self._next_reconnect_at = time.monotonic() + self._reconnect_interval
         self._open_source()
-        self._thread = threading.Thread(target=self._reader_loop, daemon=True)
-        self._thread.start()
+
+    def refresh_env(self) -> None:
+        # The environment is read once; call this again if it is changed at runtime.
+        self._env_backend = os.getenv(f"CAMERA_{self.camera_id}_BACKEND", os.getenv("CAMERA_BACKEND", "auto")).lower()
+        self._env_device_path = os.getenv(f"CAMERA_{self.camera_id}_DEVICE_PATH", "").strip()
+        self._env_device = os.getenv(f"CAMERA_{self.camera_id}_DEVICE", "").strip()
+        self._env_fallbacks = os.getenv(f"CAMERA_{self.camera_id}_FALLBACKS", "").strip()
+        self._env_probe = os.getenv("CAMERA_PROBE_INDICES", "").strip()
+        self._candidate_devices = self._build_candidate_devices()
 
     @property
     def status(self) -> Dict[str, Any]:
@@ -52,7 +89,7 @@ class CameraStream:
             "error": self._error,
         }
 
-    def _build_placeholder(self, message: str):
+    def _build_placeholder_base(self):
         if self._np is None or self._cv2 is None:
             return None
 
@@ -67,9 +104,24 @@ class CameraStream:
             3,
             self._cv2.LINE_AA,
         )
+        self._cv2.rectangle(frame, (20, 20), (self.width - 20, self.height - 20), (68, 124, 145), 3)
+        return frame
+
+    def _build_placeholder(self, message: str):
+        if self._placeholder_base is None:
+            return None
+
+        message = message[:80]
+        with self._placeholder_lock:
+            cached = self._placeholder_cache.get(message)
+            if cached is not None:
+                self._placeholder_cache.move_to_end(message)
+                return cached
+
+        frame = self._placeholder_base.copy()
         self._cv2.putText(
             frame,
-            message[:80],
+            message,
             (30, 140),
             self._cv2.FONT_HERSHEY_SIMPLEX,
             0.8,
@@ -77,7 +129,11 @@ class CameraStream:
             2,
             self._cv2.LINE_AA,
         )
-        self._cv2.rectangle(frame, (20, 20), (self.width - 20, self.height - 20), (68, 124, 145), 3)
+
+        with self._placeholder_lock:
+            self._placeholder_cache[message] = frame
+            while len(self._placeholder_cache) > _PLACEHOLDER_CACHE_SIZE:
+                self._placeholder_cache.popitem(last=False)
         return frame
 
     def _close_source(self) -> None:
@@ -100,29 +156,51 @@ class CameraStream:
         self._picamera = None
         self._source = "none"
 
-    def _open_source(self) -> None:
-        now = time.time()
+    def _request_reconnect(self) -> None:
+        # Probing can block for seconds, so it runs off the shared reader thread.
+        if self._closed or (self._reconnect_thread is not None and self._reconnect_thread.is_alive()):
+            return
+        now = time.monotonic()
         if now < self._next_reconnect_at:
             return
         self._next_reconnect_at = now + self._reconnect_interval
 
-        backend_pref = os.getenv(f"CAMERA_{self.camera_id}_BACKEND", os.getenv("CAMERA_BACKEND", "auto")).lower()
         self._close_source()
+        self._reconnect_thread = threading.Thread(
+            target=self._open_source,
+            name=f"camera-{self.camera_id}-reconnect",
+            daemon=True,
+        )
+        self._reconnect_thread.start()
+
+    def _open_source(self) -> None:
+        # _source is assigned last, so the reader never sees a half-opened capture.
+        backend_pref = self._env_backend
 
         if backend_pref in ("auto", "opencv") and self._cv2 is not None:
             open_errors: List[str] = []
-            for device in self._opencv_candidate_devices():
+            for device in self._candidate_devices:
                 try:
                     cap = self._open_opencv_capture(device)
                     if cap is None:
                         open_errors.append(f"device {device}: not opened")
                         continue
 
+                    if self._closed:
+                        cap.release()
+                        return
+
                     self._opencv_cap = cap
+                    self._wait_any_supported = self._supports_queue_probe(cap)
                     self._active_opencv_device = str(device)
-                    self._source = "opencv"
                     self._error = ""
                     self._next_reconnect_at = 0.0
+                    self._source = "opencv"
+                    if not self._buffer_size_applied:
+                        warnings.warn(
+                            f"Camera {self.camera_id}: device {device} rejected CAP_PROP_BUFFERSIZE=1; "
+                            "stale frames are dropped by grabbing ahead instead"
+                        )
                     return
                 except Exception as exc:
                     open_errors.append(f"device {device}: {exc}")
@@ -131,15 +209,21 @@ class CameraStream:
         if backend_pref in ("auto", "picamera2") and self._picamera2_class is not None and self._cv2 is not None:
             try:
                 camera = self._picamera2_class(self.camera_id)
+                # libcamera's "RGB888" is stored B, G, R, which is already OpenCV's BGR layout.
                 config = camera.create_video_configuration(
                     main={"size": (self.width, self.height), "format": "RGB888"}
                 )
                 camera.configure(config)
                 camera.start()
+                if self._closed:
+                    camera.stop()
+                    camera.close()
+                    return
+
                 self._picamera = camera
-                self._source = "picamera2"
                 self._error = ""
                 self._next_reconnect_at = 0.0
+                self._source = "picamera2"
                 return
             except Exception as exc:
                 self._error = f"Picamera2 unavailable: {exc}"
@@ -160,14 +244,14 @@ class CameraStream:
         except Exception:
             return None
 
-    def _opencv_candidate_devices(self) -> List[str | int]:
+    def _build_candidate_devices(self) -> Tuple[str | int, ...]:
         values: List[str | int] = []
 
-        path_override = os.getenv(f"CAMERA_{self.camera_id}_DEVICE_PATH", "").strip()
+        path_override = self._env_device_path
         if path_override:
             values.append(path_override)
 
-        single_override = os.getenv(f"CAMERA_{self.camera_id}_DEVICE", "").strip()
+        single_override = self._env_device
         parsed_single = self._parse_device_token(single_override)
         if parsed_single is not None:
             values.append(parsed_single)
@@ -175,31 +259,21 @@ class CameraStream:
         values.append(f"/dev/video{self.camera_id}")
         values.append(self.camera_id)
 
-        per_camera_fallback = os.getenv(f"CAMERA_{self.camera_id}_FALLBACKS", "").strip()
+        per_camera_fallback = self._env_fallbacks
         if per_camera_fallback:
             for part in per_camera_fallback.split(","):
                 parsed = self._parse_device_token(part)
                 if parsed is not None:
                     values.append(parsed)
 
-        global_probe = os.getenv("CAMERA_PROBE_INDICES", "").strip()
+        global_probe = self._env_probe
         if global_probe:
             for part in global_probe.split(","):
                 parsed = self._parse_device_token(part)
                 if parsed is not None:
                     values.append(parsed)
 
-        deduped: List[str | int] = []
-        seen: set[str] = set()
-        for value in values:
-            key = str(value)
-            if key in seen:
-                continue
-            if isinstance(value, int) and value < 0:
-                continue
-            seen.add(key)
-            deduped.append(value)
-        return deduped
+        return tuple(dict.fromkeys(value for value in values if not (isinstance(value, int) and value < 0)))
 
     def _warmup_capture(self, cap, tries: int = 20) -> bool:
         for _ in range(tries):
@@ -216,7 +290,7 @@ class CameraStream:
         cap.set(self._cv2.CAP_PROP_FRAME_HEIGHT, self.height)
         cap.set(self._cv2.CAP_PROP_FPS, self.fps)
         if hasattr(self._cv2, "CAP_PROP_BUFFERSIZE"):
-            cap.set(self._cv2.CAP_PROP_BUFFERSIZE, 1)
+            self._buffer_size_applied = bool(cap.set(self._cv2.CAP_PROP_BUFFERSIZE, 1))
         return self._warmup_capture(cap)
 
     def _open_opencv_capture(self, device):
@@ -257,50 +331,138 @@ class CameraStream:
     def _grab_frame(self):
         if self._source == "picamera2" and self._picamera is not None and self._cv2 is not None:
             try:
-                rgb = self._picamera.capture_array("main")
-                return self._cv2.cvtColor(rgb, self._cv2.COLOR_RGB2BGR)
+                return self._picamera.capture_array("main")
             except Exception as exc:
                 self._error = f"Picamera2 read failed: {exc}"
-                self._open_source()
+                self._request_reconnect()
                 return None
 
         if self._source == "opencv" and self._opencv_cap is not None:
-            ok, frame = self._opencv_cap.read()
+            cap = self._opencv_cap
+            ok = self._grab_latest(cap)
+            if ok:
+                if not self._has_demand():
+                    return _FRAME_SKIPPED
+                slot = self._retrieve_slot
+                ok, frame = cap.retrieve(self._retrieve_buffers[slot])
+                if ok:
+                    self._retrieve_buffers[slot] = frame
+                    self._retrieve_slot = 1 - slot
             if ok:
                 return frame
             self._error = f"OpenCV read failed (device {self._active_opencv_device})"
-            self._open_source()
+            self._request_reconnect()
             return None
 
-        self._open_source()
+        self._request_reconnect()
         return None
 
-    def _reader_loop(self) -> None:
-        frame_delay = 1.0 / max(self.fps, 1)
+    def _grab_latest(self, cap) -> bool:
+        # Skips queued buffers without decoding; a buffer that had to be waited for is always kept.
+        ok = True
+        for _ in range(_MAX_STALE_GRABS + 1):
+            started = time.monotonic()
+            arrived = (started - self._last_grab_at) * max(self.fps, 1)
+            self._backlog = min(self._backlog + arrived, _MAX_STALE_GRABS + 1.0)
+            ok = cap.grab()
+            self._last_grab_at = time.monotonic()
+            waited = self._last_grab_at - started >= _QUEUED_GRAB_SECONDS
+            self._backlog = 0.0 if waited else max(self._backlog - 1.0, 0.0)
+            if not ok or waited or self._buffer_size_applied or not self._has_queued_buffer(cap):
+                break
+        return ok
+
+    def _supports_queue_probe(self, cap) -> bool:
+        try:
+            return hasattr(self._cv2.VideoCapture, "waitAny") and cap.getBackendName() == "V4L2"
+        except Exception:
+            return False
 
-        while self._running:
-            frame = self._grab_frame()
-            if frame is None:
-                frame = self._build_placeholder(self._error or "Waiting for camera")
-                time.sleep(0.1)
+    def _has_queued_buffer(self, cap) -> bool:
+        if self._wait_any_supported:
+            try:
+                ready, _ = self._cv2.VideoCapture.waitAny([cap], _QUEUE_PROBE_NS)
+                return bool(ready)
+            except Exception:
+                self._wait_any_supported = False
+        # Without a readiness probe, estimate the queue from the frames delivered since the last wait.
+        return self._backlog >= 1.0
 
-            with self._lock:
-                self._latest_frame = frame
+    def poll(self) -> float:
+        # Runs one capture step; returns the monotonic time at which the stream needs polling again.
+        if time.monotonic() < self._idle_until:
+            return self._idle_until
 
-            time.sleep(frame_delay)
+        try:
+            frame = self._grab_frame()
+        except Exception as exc:
+            self._error = f"Capture failed: {exc}"[:220]
+            self._request_reconnect()
+            frame = None
+        if frame is _FRAME_SKIPPED:
+            return 0.0
+        if frame is None:
+            frame = self._build_placeholder(self._error or "Waiting for camera")
+            self._idle_until = time.monotonic() + _PLACEHOLDER_INTERVAL
+
+        self._publish_frame(frame)
+        return self._idle_until
+
+    def _publish_frame(self, frame) -> None:
+        self._published = (self._published[0] + 1, frame)
+        # Waiters register before checking the predicate, so no wakeup is lost.
+        if self._waiters:
+            with self._frame_cv:
+                self._frame_cv.notify_all()
+
+    def _wait_for_publish(self, predicate, timeout: float | None) -> None:
+        with self._frame_cv:
+            self._waiters += 1
+            try:
+                self._frame_cv.wait_for(predicate, timeout)
+            finally:
+                self._waiters -= 1
+
+    def _has_demand(self) -> bool:
+        if self._waiters or self._published[1] is None:
+            return True
+        return time.monotonic() - self._last_demand_at < _DEMAND_WINDOW
+
+    def _current_frame(self):
+        idle = not self._has_demand()
+        self._last_demand_at = time.monotonic()
+        seq, frame = self._published
+        if idle and self._source == "opencv":
+            self._wait_for_publish(lambda: self._published[0] != seq, _IDLE_WAKE_TIMEOUT)
+            seq, frame = self._published
+        if frame is None:
+            return self._build_placeholder("No frame yet")
+        return frame
 
     def get_frame(self):
-        with self._lock:
-            if self._latest_frame is None:
-                return self._build_placeholder("No frame yet")
-            if self._np is not None:
-                return self._latest_frame.copy()
-            return self._latest_frame
+        # No copy: read-only and valid for about one frame; use get_frame_into() to keep it.
+        return self._current_frame()
+
+    def get_frame_into(self, out=None):
+        frame = self._current_frame()
+        if frame is None or self._np is None:
+            return frame
+        if out is None or out.shape != frame.shape or out.dtype != frame.dtype:
+            return frame.copy()
+        self._np.copyto(out, frame)
+        return out
+
+    def wait_for_frame(self, last_seen: int | None = None, timeout: float | None = None) -> Tuple[int, Any]:
+        # Returns the published frame itself, not a copy; copy it before any slow read.
+        self._last_demand_at = time.monotonic()
+        self._wait_for_publish(
+            lambda: self._published[1] is not None and self._published[0] != last_seen,
+            timeout,
+        )
+        return self._published
 
     def close(self) -> None:
-        self._running = False
-        if hasattr(self, "_thread") and self._thread.is_alive():
-            self._thread.join(timeout=0.5)
+        self._closed = True
         self._close_source()
 
 
@@ -312,6 +474,7 @@ class CameraManager:
         np_module,
         picamera2_class,
         reconnect_interval: float,
+        reader_threads: int = 2,
     ) -> None:
         self._streams: Dict[str, CameraStream] = {
             camera_id: CameraStream(
@@ -324,15 +487,47 @@ class CameraManager:
             for camera_id in camera_ids
         }
 
+        # A fixed pool of reader threads polls all cameras round-robin.
+        self._running = True
+        streams = list(self._streams.values())
+        thread_count = max(1, min(reader_threads, len(streams)))
+        self._reader_pool: List[threading.Thread] = [
+            threading.Thread(target=self._reader_loop, args=(streams[offset::thread_count],), daemon=True)
+            for offset in range(thread_count)
+        ]
+        for thread in self._reader_pool:
+            thread.start()
+
+    def _reader_loop(self, streams: List[CameraStream]) -> None:
+        while self._running:
+            wake_at = min(stream.poll() for stream in streams)
+            delay = wake_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
     def get_stream(self, camera_id: str) -> CameraStream:
         return self._streams[camera_id]
 
     def get_frame(self, camera_id: str):
         return self._streams[camera_id].get_frame()
 
+    def get_frame_into(self, camera_id: str, out=None):
+        return self._streams[camera_id].get_frame_into(out)
+
+    def get_frame_blocking(self, camera_id: str, timeout: float, last_seen: int | None = None):
+        # Waits for a frame newer than last_seen; returns (seq, frame) or None on timeout.
+        seq, frame = self._streams[camera_id].wait_for_frame(last_seen, timeout)
+        if frame is None or seq == last_seen:
+            return None
+        return seq, frame
+
     def status(self) -> Dict[str, Dict[str, Any]]:
         return {camera_id: stream.status for camera_id, stream in self._streams.items()}
 
     def close_all(self) -> None:
+        self._running = False
+        for thread in self._reader_pool:
+            if thread.is_alive():
+                thread.join(timeout=0.5)
         for stream in self._streams.values():
             stream.close()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import warnings
+from typing import List, Tuple
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency
+    np = None
+
+try:
+    from numba import njit
+except Exception:  # pragma: no cover - optional dependency
+    njit = None
+
+from config import COLOR_PROTOTYPES_HSV
+
+COLOR_CODES = tuple(COLOR_PROTOTYPES_HSV)
+_WHITE_INDEX = COLOR_CODES.index("W")
+
+
+def _nearest_prototype(h, s, v, prototypes):
+    best_score = 1e30
+    second_score = 1e30
+    best_index = 0
+    for j in range(prototypes.shape[0]):
+        hue_delta = abs(h - prototypes[j, 0])
+        hue_dist = min(hue_delta, 180.0 - hue_delta) / 90.0
+        sat_dist = abs(s - prototypes[j, 1]) / 255.0
+        val_dist = abs(v - prototypes[j, 2]) / 255.0
+        score = 0.55 * hue_dist + 0.25 * sat_dist + 0.20 * val_dist
+        if score < best_score:
+            second_score = best_score
+            best_score = score
+            best_index = j
+        elif score < second_score:
+            second_score = score
+    if prototypes.shape[0] < 2:
+        second_score = 1.0
+
+    confidence = 1.0 - (best_score / (second_score + 1e-6))
+    return best_index, max(0.05, min(confidence, 0.99))
+
+
+def _classify_colors_kernel(hsv_means, prototypes, white_index, codes_out, confidence_out):
+    for i in range(hsv_means.shape[0]):
+        h = hsv_means[i, 0]
+        s = hsv_means[i, 1]
+        v = hsv_means[i, 2]
+
+        if s < 35.0 and v > 120.0:
+            codes_out[i] = white_index
+            confidence_out[i] = 0.78
+            continue
+
+        codes_out[i], confidence_out[i] = _nearest_prototype(h, s, v, prototypes)
+
+
+if njit is not None and np is not None:
+    _PROTOTYPES = np.array(list(COLOR_PROTOTYPES_HSV.values()), dtype=np.float64)
+    # Rebound first so the kernel compiles against it; no fastmath, which can flip near-ties.
+    _nearest_prototype = njit(cache=True)(_nearest_prototype)
+    _classify_colors_jit = njit(cache=True)(_classify_colors_kernel)
+else:
+    _PROTOTYPES = None
+    _classify_colors_jit = None
+
+NUMBA_AVAILABLE = _classify_colors_jit is not None
+
+
+def classify_colors(hsv_means) -> List[Tuple[str, float]]:
+    if _classify_colors_jit is None:
+        raise RuntimeError("numba is not installed")
+
+    means = np.ascontiguousarray(hsv_means, dtype=np.float64).reshape(-1, 3)
+    codes = np.empty(means.shape[0], dtype=np.int32)
+    confidences = np.empty(means.shape[0], dtype=np.float64)
+    _classify_colors_jit(means, _PROTOTYPES, _WHITE_INDEX, codes, confidences)
+    return [(COLOR_CODES[code], float(confidence)) for code, confidence in zip(codes.tolist(), confidences)]
+
+
+if NUMBA_AVAILABLE:
+    # Compile at import so the first detection request doesn't pay for the JIT.
+    try:
+        classify_colors([(0.0, 0.0, 0.0)])
+    except Exception as exc:
+        warnings.warn(f"Numba colour kernel failed to compile, using the Python scorer: {exc}")
+        _classify_colors_jit = None
+        NUMBA_AVAILABLE = False
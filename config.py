@@ -41,4 +41,8 @@ COLOR_NAMES = {
 UART_PORT = os.getenv("UART_PORT", "/dev/ttyAMA0")
 UART_BAUD = int(os.getenv("UART_BAUD", "115200"))
 UART_TIMEOUT = float(os.getenv("UART_TIMEOUT", "1.0"))
+SOLVE_TIMEOUT = float(os.getenv("SOLVE_TIMEOUT", "10.0"))
 CAMERA_RECONNECT_INTERVAL = float(os.getenv("CAMERA_RECONNECT_INTERVAL", "2.0"))
+CAMERA_READER_THREADS = int(os.getenv("CAMERA_READER_THREADS", "2"))
+STREAM_JPEG_QUALITY = int(os.getenv("STREAM_JPEG_QUALITY", "70"))
+DETECTION_FRAME_WIDTH = int(os.getenv("DETECTION_FRAME_WIDTH", "320"))
@@ -1,60 +1,75 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Tuple
 
 from config import COLOR_PROTOTYPES_HSV, FACE_ORDER
 
+_FACE_OFFSETS = {face: slot * 9 for slot, face in enumerate(FACE_ORDER)}
+_VALID_COLORS = frozenset(COLOR_PROTOTYPES_HSV)
+_FACE_CODES = tuple(ord(face) for face in FACE_ORDER)
+_UNKNOWN_FACE = ("?",) * 9
+_UNKNOWN_SLOTS = _UNKNOWN_FACE * len(FACE_ORDER)
+
 
 def default_cube_state() -> Dict[str, Any]:
     return {
         "captured_at": None,
         "complete": False,
         "kociemba_input": None,
-        "faces": {face: ["?"] * 9 for face in FACE_ORDER},
+        "faces": {face: list(_UNKNOWN_FACE) for face in FACE_ORDER},
         "detections": {"0": [], "1": []},
     }
 
 
-def build_face_state(detections: Dict[str, List[Dict[str, Any]]]) -> Tuple[Dict[str, List[str]], bool]:
-    faces: Dict[str, List[str]] = {face: ["?"] * 9 for face in FACE_ORDER}
-
-    for camera_results in detections.values():
-        for sticker in camera_results:
-            face = sticker["face"]
-            index = int(sticker["index"])
-            if face in faces and 0 <= index <= 8:
-                faces[face][index] = sticker["color"]
-
-    complete = all(
-        len(face_values) == 9 and all(color in COLOR_PROTOTYPES_HSV for color in face_values)
-        for face_values in faces.values()
-    )
+def detections_as_tuples(detections: Dict[str, List[Dict[str, Any]]]) -> List[Tuple[str, int, str]]:
+    return [
+        (sticker["face"], int(sticker["index"]), sticker["color"])
+        for camera_results in detections.values()
+        for sticker in camera_results
+    ]
+
+
+def build_face_state_from_tuples(stickers: Iterable[Tuple[str, int, str]]) -> Tuple[Dict[str, List[str]], bool]:
+    # Stickers are collected face-major into one flat list and split into per-face lists only on return.
+    slots = list(_UNKNOWN_SLOTS)
+    face_offset = _FACE_OFFSETS.get
+    for face, index, color in stickers:
+        offset = face_offset(face)
+        if offset is not None and 0 <= index <= 8:
+            slots[offset + index] = color
+
+    complete = all(color in _VALID_COLORS for color in slots)
+    faces = {face: slots[offset:offset + 9] for face, offset in _FACE_OFFSETS.items()}
     return faces, complete
 
 
+def build_face_state(detections: Dict[str, List[Dict[str, Any]]]) -> Tuple[Dict[str, List[str]], bool]:
+    return build_face_state_from_tuples(detections_as_tuples(detections))
+
+
 def cube_to_kociemba_input(face_state: Dict[str, List[str]]) -> str:
     for face in FACE_ORDER:
         if face not in face_state or len(face_state[face]) != 9:
             raise ValueError(f"Face {face} is missing or incomplete")
 
-    centers: Dict[str, str] = {}
-    for face in FACE_ORDER:
-        center_color = face_state[face][4]
-        if center_color not in COLOR_PROTOTYPES_HSV:
+    centers = [face_state[face][4] for face in FACE_ORDER]
+    for face, center_color in zip(FACE_ORDER, centers):
+        if center_color not in _VALID_COLORS:
             raise ValueError(f"Center sticker of face {face} is unknown ({center_color})")
-        centers[face] = center_color
 
-    if len(set(centers.values())) != 6:
+    if len(set(centers)) != 6:
         raise ValueError("Center colors are not unique; cube orientation cannot be inferred")
 
-    color_to_face = {color: face for face, color in centers.items()}
+    color_to_face = dict(zip(centers, _FACE_CODES))
 
-    result: List[str] = []
+    result = bytearray(len(FACE_ORDER) * 9)
+    position = 0
     for face in FACE_ORDER:
         for color in face_state[face]:
             mapped = color_to_face.get(color)
             if mapped is None:
                 raise ValueError(f"Color {color} has no matching center face")
-            result.append(mapped)
+            result[position] = mapped
+            position += 1
 
-    return "".join(result)
+    return result.decode("ascii")
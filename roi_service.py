@@ -1,50 +1,74 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
 
 from config import CAMERA_FACE_MAP, CAMERA_IDS, FACE_ORDER
-from utils import clamp
+from utils import clamp, deep_copy
 
+_VALID_FACES = frozenset(FACE_ORDER)
+_DEFAULT_FACE_BLOCK = 0.26
+_DEFAULT_BOX_SIZE = round(_DEFAULT_FACE_BLOCK / 3.0 * 0.82, 5)
 
-def default_rois_for_camera(camera_id: str) -> List[Dict[str, Any]]:
-    faces = CAMERA_FACE_MAP[camera_id]
-    rois: List[Dict[str, Any]] = []
 
+def _build_default_layout() -> Tuple[Tuple[int, int, float, float], ...]:
     face_origins = [0.05, 0.37, 0.69]
     origin_y = 0.17
-    face_block = 0.26
-    cell = face_block / 3.0
+    cell = _DEFAULT_FACE_BLOCK / 3.0
     box_size = cell * 0.82
 
-    for face_idx, face in enumerate(faces):
-        origin_x = face_origins[face_idx]
+    layout: List[Tuple[int, int, float, float]] = []
+    for face_idx, origin_x in enumerate(face_origins):
         for row in range(3):
             for col in range(3):
-                sticker_index = row * 3 + col
                 x = origin_x + col * cell + (cell - box_size) / 2.0
                 y = origin_y + row * cell + (cell - box_size) / 2.0
-                rois.append(
-                    {
-                        "id": f"{face}{sticker_index}",
-                        "face": face,
-                        "index": sticker_index,
-                        "x": round(x, 5),
-                        "y": round(y, 5),
-                        "w": round(box_size, 5),
-                        "h": round(box_size, 5),
-                    }
-                )
+                layout.append((face_idx, row * 3 + col, round(x, 5), round(y, 5)))
+    return tuple(layout)
+
+
+# The default grid is identical for every camera; only the face letters differ.
+_DEFAULT_LAYOUT = _build_default_layout()
 
-    return rois
+
+def default_rois_for_camera(camera_id: str) -> List[Dict[str, Any]]:
+    faces = CAMERA_FACE_MAP[camera_id]
+    return [
+        {
+            "id": f"{faces[face_idx]}{sticker_index}",
+            "face": faces[face_idx],
+            "index": sticker_index,
+            "x": x,
+            "y": y,
+            "w": _DEFAULT_BOX_SIZE,
+            "h": _DEFAULT_BOX_SIZE,
+        }
+        for face_idx, sticker_index, x, y in _DEFAULT_LAYOUT
+    ]
 
 
 def build_default_roi_config() -> Dict[str, List[Dict[str, Any]]]:
     return {camera_id: default_rois_for_camera(camera_id) for camera_id in CAMERA_IDS}
 
 
+@lru_cache(maxsize=1)
+def _cached_default_roi_config() -> Dict[str, List[Dict[str, Any]]]:
+    return build_default_roi_config()
+
+
+# Last validated ROI list per camera, keyed by the raw input it was normalized from.
+_VALIDATED_CACHE: Dict[str, Tuple[Tuple[Any, ...], List[Dict[str, Any]]]] = {}
+
+
+def _default_rois(camera_id: str, mutable: bool) -> List[Dict[str, Any]]:
+    # The cached lists are shared between callers; only hand them out when the caller won't mutate them.
+    rois = _cached_default_roi_config()[camera_id]
+    return deep_copy(rois) if mutable else rois
+
+
 def normalize_roi(raw: Dict[str, Any]) -> Dict[str, Any]:
     face = str(raw.get("face", "U")).upper()
-    if face not in FACE_ORDER:
+    if face not in _VALID_FACES:
         face = "U"
 
     try:
@@ -76,24 +100,38 @@ def normalize_roi(raw: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def validate_camera_rois(camera_id: str, candidate: Any) -> List[Dict[str, Any]]:
+def _roi_signature(candidate: List[Any]) -> Tuple[Any, ...]:
+    # Types are part of the key because 1, 1.0 and True compare equal but normalize differently.
+    return tuple(
+        tuple((key, value.__class__, value) for key, value in item.items())
+        for item in candidate
+        if isinstance(item, dict)
+    )
+
+
+def validate_camera_rois(camera_id: str, candidate: Any, mutable: bool = False) -> List[Dict[str, Any]]:
     if not isinstance(candidate, list):
-        return default_rois_for_camera(camera_id)
+        return _default_rois(camera_id, mutable)
+
+    signature = _roi_signature(candidate)
+    cached = _VALIDATED_CACHE.get(camera_id)
+    if cached is not None and cached[0] == signature:
+        return deep_copy(cached[1]) if mutable else cached[1]
 
     normalized = [normalize_roi(item) for item in candidate if isinstance(item, dict)]
     if len(normalized) != 27:
-        return default_rois_for_camera(camera_id)
+        return _default_rois(camera_id, mutable)
 
-    return normalized
+    _VALIDATED_CACHE[camera_id] = (signature, normalized)
+    return deep_copy(normalized) if mutable else normalized
 
 
-def validate_roi_config(candidate: Any) -> Dict[str, List[Dict[str, Any]]]:
-    defaults = build_default_roi_config()
+def validate_roi_config(candidate: Any, mutable: bool = False) -> Dict[str, List[Dict[str, Any]]]:
     if not isinstance(candidate, dict):
-        return defaults
+        return {camera_id: _default_rois(camera_id, mutable) for camera_id in CAMERA_IDS}
 
     clean: Dict[str, List[Dict[str, Any]]] = {}
     for camera_id in CAMERA_IDS:
-        clean[camera_id] = validate_camera_rois(camera_id, candidate.get(camera_id))
+        clean[camera_id] = validate_camera_rois(camera_id, candidate.get(camera_id), mutable)
 
     return clean
@@ -4,6 +4,8 @@ import atexit
 import os
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
 from typing import Any, Dict, List, Tuple
 
 from flask import Flask, Response, jsonify, render_template, request
@@ -18,11 +20,21 @@ try:
 except Exception:  # pragma: no cover - optional dependency
     np = None
 
+try:
+    import simplejpeg
+except Exception:  # pragma: no cover - optional dependency
+    simplejpeg = None
+
 try:
     from picamera2 import Picamera2
 except Exception:  # pragma: no cover - optional dependency
     Picamera2 = None
 
+try:
+    from waitress import serve as waitress_serve
+except Exception:  # pragma: no cover - optional dependency
+    waitress_serve = None
+
 try:
     import kociemba
 except Exception:  # pragma: no cover - optional dependency
@@ -34,15 +46,20 @@ except Exception:  # pragma: no cover - optional dependency
     serial = None
 
 from camera_service import CameraManager
+from classify_numba import NUMBA_AVAILABLE, classify_colors
 from config import (
     BASE_DIR,
     CAMERA_IDS,
+    CAMERA_READER_THREADS,
     CAMERA_RECONNECT_INTERVAL,
     COLOR_NAMES,
     COLOR_PROTOTYPES_HSV,
     CUBE_STATE_FILE,
+    DETECTION_FRAME_WIDTH,
     LAST_SOLUTION_FILE,
     ROI_FILE,
+    SOLVE_TIMEOUT,
+    STREAM_JPEG_QUALITY,
     UART_BAUD,
     UART_PORT,
     UART_TIMEOUT,
@@ -66,6 +83,14 @@ app = Flask(
 roi_lock = threading.Lock()
 roi_config = validate_roi_config(load_json(ROI_FILE, build_default_roi_config()))
 save_json(ROI_FILE, roi_config)
+# Serialized GET /api/rois body; reset to None whenever roi_config changes.
+roi_json_cache: bytes | None = None
+# Bumped on every roi_config change; keys the per-frame-size pixel rectangles below.
+roi_version = 0
+roi_pixel_cache: Dict[Tuple[int, int, int, str], List[Tuple[int, int, int, int]]] = {}
+roi_skeleton_cache: Dict[Tuple[int, str], List[Dict[str, Any]]] = {}
+
+CONFIDENCE_PCT_LABELS = [f"{pct}%" for pct in range(101)]
 
 cube_state_lock = threading.Lock()
 cube_state = load_json(CUBE_STATE_FILE, default_cube_state())
@@ -79,14 +104,43 @@ camera_manager = CameraManager(
     np_module=np,
     picamera2_class=Picamera2,
     reconnect_interval=CAMERA_RECONNECT_INTERVAL,
+    reader_threads=CAMERA_READER_THREADS,
 )
 atexit.register(camera_manager.close_all)
 
+# Cameras are sampled in parallel; the OpenCV kernels release the GIL.
+detection_pool = ThreadPoolExecutor(max_workers=len(CAMERA_IDS), thread_name_prefix="detect")
+atexit.register(detection_pool.shutdown)
+
+# kociemba runs off the request thread so a slow search can be bounded by SOLVE_TIMEOUT.
+solve_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="solve")
+atexit.register(solve_pool.shutdown)
+
+PROTOTYPE_CODES = list(COLOR_PROTOTYPES_HSV)
+if np is not None:
+    # Whole-number 8-bit prototypes fit int16 exactly; the float means upcast the arithmetic.
+    PROTOTYPE_H, PROTOTYPE_S, PROTOTYPE_V = (
+        np.array([prototype[channel] for prototype in COLOR_PROTOTYPES_HSV.values()], dtype=np.int16)
+        for channel in range(3)
+    )
+
+
+_BOUNDARY_HEADER = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
+_BOUNDARY_TAIL = b"\r\n"
+
 
-def frame_to_jpeg(frame) -> bytes | None:
-    if frame is None or cv2 is None:
+def frame_to_jpeg(frame, quality: int = STREAM_JPEG_QUALITY) -> bytes | None:
+    if frame is None:
         return None
-    ok, encoded = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
+    if simplejpeg is not None and np is not None:
+        return simplejpeg.encode_jpeg(np.ascontiguousarray(frame), quality=quality, colorspace="BGR", fastdct=True)
+    if cv2 is None:
+        return None
+    ok, encoded = cv2.imencode(
+        ".jpg",
+        frame,
+        [int(cv2.IMWRITE_JPEG_QUALITY), quality, int(cv2.IMWRITE_JPEG_OPTIMIZE), 0],
+    )
     if not ok:
         return None
     return encoded.tobytes()
@@ -114,22 +168,36 @@ def classify_hsv(mean_hsv: Tuple[float, float, float]) -> Tuple[str, float]:
     if s < 35.0 and v > 120.0:
         return "W", 0.78
 
-    distances: List[Tuple[float, str]] = []
-    for color_code, prototype in COLOR_PROTOTYPES_HSV.items():
-        p_h, p_s, p_v = prototype
-        hue_dist = min(abs(h - p_h), 180.0 - abs(h - p_h)) / 90.0
-        sat_dist = abs(s - p_s) / 255.0
-        val_dist = abs(v - p_v) / 255.0
-        score = 0.55 * hue_dist + 0.25 * sat_dist + 0.20 * val_dist
-        distances.append((score, color_code))
+    if np is None:
+        scores = []
+        for p_h, p_s, p_v in COLOR_PROTOTYPES_HSV.values():
+            hue_dist = min(abs(h - p_h), 180.0 - abs(h - p_h)) / 90.0
+            sat_dist = abs(s - p_s) / 255.0
+            val_dist = abs(v - p_v) / 255.0
+            scores.append(0.55 * hue_dist + 0.25 * sat_dist + 0.20 * val_dist)
+        ranked = sorted(range(len(scores)), key=scores.__getitem__)
+    else:
+        hue_delta = np.abs(PROTOTYPE_H - h)
+        hue_dist = np.minimum(hue_delta, 180.0 - hue_delta) / 90.0
+        sat_dist = np.abs(PROTOTYPE_S - s) / 255.0
+        val_dist = np.abs(PROTOTYPE_V - v) / 255.0
+        scores = 0.55 * hue_dist + 0.25 * sat_dist + 0.20 * val_dist
+        ranked = np.argsort(scores, kind="stable")
 
-    distances.sort(key=lambda item: item[0])
-    best_score, best_color = distances[0]
-    second_score = distances[1][0] if len(distances) > 1 else 1.0
+    best_score = float(scores[ranked[0]])
+    second_score = float(scores[ranked[1]]) if len(ranked) > 1 else 1.0
 
     confidence = 1.0 - (best_score / (second_score + 1e-6))
     confidence = clamp(confidence, 0.05, 0.99)
-    return best_color, confidence
+    return PROTOTYPE_CODES[ranked[0]], confidence
+
+
+def classify_many(mean_values: List[Tuple[float, float, float]]) -> List[Tuple[str, float]]:
+    if not mean_values:
+        return []
+    if NUMBA_AVAILABLE:
+        return classify_colors(mean_values)
+    return [classify_hsv(mean_hsv) for mean_hsv in mean_values]
 
 
 def roi_to_pixels(roi: Dict[str, Any], frame_width: int, frame_height: int) -> Tuple[int, int, int, int]:
@@ -143,47 +211,83 @@ def roi_to_pixels(roi: Dict[str, Any], frame_width: int, frame_height: int) -> T
     return x1, y1, x2, y2
 
 
-def detect_for_camera(camera_id: str, rois: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def roi_boxes(
+    camera_id: str,
+    rois: List[Dict[str, Any]],
+    frame_w: int,
+    frame_h: int,
+    version: int | None,
+) -> List[Tuple[int, int, int, int]]:
+    key = (version, frame_w, frame_h, camera_id)
+    boxes = roi_pixel_cache.get(key) if version is not None else None
+    if boxes is None:
+        boxes = [roi_to_pixels(roi, frame_w, frame_h) for roi in rois]
+        if version is not None:
+            if len(roi_pixel_cache) >= 16:
+                roi_pixel_cache.clear()
+            roi_pixel_cache[key] = boxes
+    return boxes
+
+
+def roi_skeletons(camera_id: str, rois: List[Dict[str, Any]], version: int | None) -> List[Dict[str, Any]]:
+    key = (version, camera_id)
+    skeletons = roi_skeleton_cache.get(key) if version is not None else None
+    if skeletons is None:
+        skeletons = [{"id": roi["id"], "face": roi["face"], "index": roi["index"]} for roi in rois]
+        if version is not None:
+            if len(roi_skeleton_cache) >= 16:
+                roi_skeleton_cache.clear()
+            roi_skeleton_cache[key] = skeletons
+    return skeletons
+
+
+def detect_for_camera(
+    camera_id: str,
+    rois: List[Dict[str, Any]],
+    version: int | None = None,
+) -> List[Dict[str, Any]]:
+    skeletons = roi_skeletons(camera_id, rois, version)
     frame = camera_manager.get_frame(camera_id)
     if frame is None or cv2 is None or np is None:
-        return [
-            {
-                "id": roi["id"],
-                "face": roi["face"],
-                "index": roi["index"],
-                "color": "?",
-                "color_name": COLOR_NAMES["?"],
-                "confidence": 0.0,
-                "label": "?0%",
-            }
-            for roi in rois
-        ]
+        unknown = {"color": "?", "color_name": COLOR_NAMES["?"], "confidence": 0.0, "label": "?0%"}
+        return [{**skeleton, **unknown} for skeleton in skeletons]
 
     frame_h, frame_w = frame.shape[:2]
-    results: List[Dict[str, Any]] = []
-
-    for roi in rois:
-        x1, y1, x2, y2 = roi_to_pixels(roi, frame_w, frame_h)
-        crop = frame[y1:y2, x1:x2]
+    if frame_w > DETECTION_FRAME_WIDTH > 0:
+        # Area-averaged downscale: ROI means survive it and the HSV conversion shrinks with it.
+        frame_h = max(1, int(frame_h * DETECTION_FRAME_WIDTH / frame_w))
+        frame_w = DETECTION_FRAME_WIDTH
+        frame = cv2.resize(frame, (frame_w, frame_h), interpolation=cv2.INTER_AREA)
+    hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    # Every ROI below is a view into this buffer; freeze it while the means are taken.
+    hsv_frame.setflags(write=False)
+
+    # On the downscaled frame, per-ROI cv2.mean beats building a full-frame integral image.
+    roi_views = [
+        hsv_frame[y1:y2, x1:x2] if x2 > x1 and y2 > y1 else None
+        for x1, y1, x2, y2 in roi_boxes(camera_id, rois, frame_w, frame_h, version)
+    ]
+    mean_values: List[Tuple[float, float, float] | None] = [
+        cv2.mean(view)[:3] if view is not None else None for view in roi_views
+    ]
+
+    classified = iter(classify_many([value for value in mean_values if value is not None]))
 
-        if crop.size == 0:
+    results: List[Dict[str, Any]] = []
+    for skeleton, mean_value in zip(skeletons, mean_values):
+        if mean_value is None:
             color_code = "?"
             confidence = 0.0
         else:
-            hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
-            mean_hsv = hsv.mean(axis=(0, 1))
-            color_code, confidence = classify_hsv((float(mean_hsv[0]), float(mean_hsv[1]), float(mean_hsv[2])))
+            color_code, confidence = next(classified)
 
-        confidence_pct = int(round(confidence * 100))
         results.append(
             {
-                "id": roi["id"],
-                "face": roi["face"],
-                "index": roi["index"],
+                **skeleton,
                 "color": color_code,
                 "color_name": COLOR_NAMES.get(color_code, "Unknown"),
                 "confidence": round(confidence, 3),
-                "label": f"{color_code}{confidence_pct}%",
+                "label": color_code + CONFIDENCE_PCT_LABELS[int(round(confidence * 100))],
             }
         )
 
@@ -193,11 +297,13 @@ def detect_for_camera(camera_id: str, rois: List[Dict[str, Any]]) -> List[Dict[s
 def detect_all_cameras() -> Dict[str, List[Dict[str, Any]]]:
     with roi_lock:
         rois_snapshot = deep_copy(roi_config)
+        version = roi_version
 
-    output: Dict[str, List[Dict[str, Any]]] = {}
-    for camera_id in CAMERA_IDS:
-        output[camera_id] = detect_for_camera(camera_id, rois_snapshot[camera_id])
-    return output
+    futures = {
+        camera_id: detection_pool.submit(detect_for_camera, camera_id, rois_snapshot[camera_id], version)
+        for camera_id in CAMERA_IDS
+    }
+    return {camera_id: future.result() for camera_id, future in futures.items()}
 
 
 def capture_cube_state() -> Dict[str, Any]:
@@ -229,25 +335,38 @@ def capture_cube_state() -> Dict[str, Any]:
     return state
 
 
+@lru_cache(maxsize=256)
+def _solve_cached(kociemba_input: str) -> str:
+    # kociemba is deterministic per facelet string, so retries and double-clicks hit the cache.
+    return kociemba.solve(kociemba_input)
+
+
 def save_last_solution(solution_payload: Dict[str, Any]) -> None:
     save_json(LAST_SOLUTION_FILE, solution_payload)
 
 
 def stream_generator(camera_id: str):
+    last_seq = None
+    frame_buffer = None
     while True:
-        frame = camera_manager.get_frame(camera_id)
-        jpeg = frame_to_jpeg(frame)
-
-        if jpeg is None:
+        published = camera_manager.get_frame_blocking(camera_id, 1.0, last_seq)
+        if published is None:
             jpeg = fallback_frame_to_jpeg(camera_id)
+        else:
+            last_seq = published[0]
+            # The reader reuses the published array two frames later; encode from a private copy.
+            frame_buffer = camera_manager.get_frame_into(camera_id, frame_buffer)
+            jpeg = frame_to_jpeg(frame_buffer)
             if jpeg is None:
-                time.sleep(0.05)
-                continue
+                jpeg = fallback_frame_to_jpeg(camera_id)
 
-        yield (
-            b"--frame\r\n"
-            b"Content-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
-        )
+        if jpeg is None:
+            continue
+
+        # Separate chunks so the JPEG payload is never copied into a combined buffer.
+        yield _BOUNDARY_HEADER
+        yield jpeg
+        yield _BOUNDARY_TAIL
 
 
 @app.route("/")
@@ -263,6 +382,7 @@ def stream(camera_id: str):
     return Response(
         stream_generator(camera_id),
         mimetype="multipart/x-mixed-replace; boundary=frame",
+        direct_passthrough=True,
     )
 
 
@@ -275,26 +395,33 @@ def api_health():
             "libraries": {
                 "opencv": cv2 is not None,
                 "numpy": np is not None,
+                "simplejpeg": simplejpeg is not None,
                 "picamera2": Picamera2 is not None,
                 "kociemba": kociemba is not None,
+                "numba": NUMBA_AVAILABLE,
                 "pyserial": serial is not None,
             },
             "uart": {
                 "port": UART_PORT,
                 "baud": UART_BAUD,
             },
+            "stream": {
+                "jpeg_quality": STREAM_JPEG_QUALITY,
+            },
         }
     )
 
 
 @app.route("/api/rois", methods=["GET", "POST"])
 def api_rois():
-    global roi_config
+    global roi_config, roi_json_cache, roi_version
 
     if request.method == "GET":
         with roi_lock:
-            snapshot = deep_copy(roi_config)
-        return jsonify({"rois": snapshot})
+            if roi_json_cache is None:
+                roi_json_cache = app.json.dumps({"rois": roi_config}).encode("utf-8")
+            body = roi_json_cache
+        return Response(body, mimetype="application/json")
 
     payload = request.get_json(silent=True) or {}
 
@@ -313,6 +440,8 @@ def api_rois():
                 if camera_id in posted_rois:
                     roi_config[camera_id] = validate_camera_rois(camera_id, posted_rois[camera_id])
 
+        roi_json_cache = None
+        roi_version += 1
         save_json(ROI_FILE, roi_config)
         snapshot = deep_copy(roi_config)
 
@@ -321,7 +450,7 @@ def api_rois():
 
 @app.route("/api/rois/reset", methods=["POST"])
 def api_rois_reset():
-    global roi_config
+    global roi_config, roi_json_cache, roi_version
 
     payload = request.get_json(silent=True) or {}
     selected_camera = payload.get("camera_id")
@@ -335,6 +464,8 @@ def api_rois_reset():
                 return jsonify({"error": "Unknown camera id"}), 400
             roi_config[camera_id] = default_rois_for_camera(camera_id)
 
+        roi_json_cache = None
+        roi_version += 1
         save_json(ROI_FILE, roi_config)
         snapshot = deep_copy(roi_config)
 
@@ -354,7 +485,8 @@ def api_detect():
             return jsonify({"error": "Unknown camera id"}), 400
         with roi_lock:
             rois = deep_copy(roi_config[camera_id])
-        detections = {camera_id: detect_for_camera(camera_id, rois)}
+            version = roi_version
+        detections = {camera_id: detect_for_camera(camera_id, rois, version)}
 
     return jsonify({"timestamp": time.time(), "cameras": detections})
 
@@ -398,7 +530,9 @@ def api_solve():
         return jsonify({"error": "kociemba package is not installed"}), 500
 
     try:
-        solution = kociemba.solve(kociemba_input)
+        solution = solve_pool.submit(_solve_cached, kociemba_input).result(timeout=SOLVE_TIMEOUT)
+    except FutureTimeoutError:
+        return jsonify({"error": f"kociemba.solve timed out after {SOLVE_TIMEOUT:g}s"}), 504
     except Exception as exc:
         return jsonify({"error": f"kociemba.solve failed: {exc}"}), 500
 
@@ -426,6 +560,13 @@ def api_solve():
     return jsonify(response)
 
 
+@app.route("/api/solve/cache/clear", methods=["POST"])
+def api_solve_cache_clear():
+    cleared = _solve_cached.cache_info().currsize
+    _solve_cached.cache_clear()
+    return jsonify({"ok": True, "cleared": cleared})
+
+
 @app.route("/api/uart/send", methods=["POST"])
 def api_uart_send():
     payload = request.get_json(silent=True) or {}
@@ -445,8 +586,18 @@ def api_uart_send():
     return jsonify({"ok": True, "uart": result})
 
 
+# Single worker only (camera state is per process): `gunicorn -k gthread -w 1 --threads 48 server:application`.
+application = app
+
+# Every open MJPEG stream holds one thread, two per browser tab.
+WSGI_THREADS = int(os.getenv("WSGI_THREADS", "48"))
+
+
 if __name__ == "__main__":
     host = os.getenv("FLASK_HOST", "0.0.0.0")
     port = int(os.getenv("FLASK_PORT", "5000"))
     debug = os.getenv("FLASK_DEBUG", "0") == "1"
-    app.run(host=host, port=port, debug=debug, threaded=True)
+    if debug or waitress_serve is None:
+        app.run(host=host, port=port, debug=debug, threaded=True)
+    else:
+        waitress_serve(app, host=host, port=port, threads=WSGI_THREADS, channel_timeout=60)
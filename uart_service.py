@@ -1,7 +1,44 @@
 from __future__ import annotations
 
-import time
-from typing import Any, Dict
+import atexit
+import threading
+from typing import Any, Dict, Tuple
+
+# Kept open across commands: reopening toggles DTR, which resets many USB-UART bridges.
+_conn_lock = threading.Lock()
+_conn = None
+_conn_key: Tuple[str, int, float] | None = None
+
+
+def _close_connection_locked() -> None:
+    global _conn, _conn_key
+    if _conn is not None:
+        try:
+            _conn.close()
+        except Exception:
+            pass
+    _conn = None
+    _conn_key = None
+
+
+def _get_connection(serial_module, port: str, baud: int, timeout: float):
+    global _conn, _conn_key
+    key = (port, baud, timeout)
+    if _conn is not None and _conn_key == key and _conn.is_open:
+        return _conn
+
+    _close_connection_locked()
+    _conn = serial_module.Serial(port, baud, timeout=timeout)
+    _conn_key = key
+    return _conn
+
+
+def close_uart_connection() -> None:
+    with _conn_lock:
+        _close_connection_locked()
+
+
+atexit.register(close_uart_connection)
 
 
 def send_uart_command(
@@ -19,11 +56,17 @@ def send_uart_command(
         raise ValueError("Command is empty")
 
     payload = (command + "\n").encode("ascii", errors="ignore")
-    with serial_module.Serial(port, baud, timeout=timeout) as connection:
-        connection.write(payload)
-        connection.flush()
-        time.sleep(0.15)
-        response_bytes = connection.read_all()
+    with _conn_lock:
+        connection = _get_connection(serial_module, port, baud, timeout)
+        try:
+            connection.reset_input_buffer()
+            connection.write(payload)
+            connection.flush()
+            # Returns as soon as the MCU terminates its reply; the port timeout bounds the wait.
+            response_bytes = connection.read_until(b"\n", 4096)
+        except Exception:
+            _close_connection_locked()
+            raise
 
     response = response_bytes.decode("ascii", errors="ignore").strip() if response_bytes else ""
     return {
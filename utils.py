@@ -1,12 +1,24 @@
 from __future__ import annotations
 
 import json
+import os
+import threading
 from pathlib import Path
 from typing import Any
 
+try:
+    import orjson
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None
+
 
 def deep_copy(value: Any) -> Any:
-    return json.loads(json.dumps(value))
+    value_type = type(value)
+    if value_type is dict:
+        return {key: deep_copy(item) for key, item in value.items()}
+    if value_type is list or value_type is tuple:
+        return [deep_copy(item) for item in value]
+    return value
 
 
 def clamp(value: float, lower: float, upper: float) -> float:
@@ -17,12 +29,29 @@ def load_json(path: Path, default: Any) -> Any:
     if not path.exists():
         return deep_copy(default)
     try:
-        with path.open("r", encoding="utf-8") as handle:
-            return json.load(handle)
+        data = path.read_bytes()
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
     except Exception:
         return deep_copy(default)
 
 
 def save_json(path: Path, payload: Any) -> None:
-    with path.open("w", encoding="utf-8") as handle:
-        json.dump(payload, handle, indent=2)
+    if orjson is not None:
+        data = orjson.dumps(payload, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(payload, indent=2).encode("utf-8")
+
+    # Write a sibling temp file and rename it over the target so readers never see a partial file.
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp_path.open("wb") as handle:
+            handle.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise